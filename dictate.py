@@ -7,15 +7,19 @@ Supports both X11 and Wayland.
 
 import argparse
 import configparser
+import dataclasses
+import hashlib
+import json
 import logging
+import re
 import subprocess
-import tempfile
 import threading
 import time
 import signal
 import sys
 import os
-import select
+import selectors
+import shutil
 from pathlib import Path
 
 # System tray support using GTK AppIndicator (like Toshy)
@@ -34,8 +38,17 @@ try:
 except (ImportError, ValueError) as e:
     pass
 
+# Session D-Bus access over a persistent Gio connection (falls back to forking gdbus)
+HAS_GIO = False
+try:
+    from gi.repository import Gio, GLib
+    HAS_GIO = True
+except ImportError:
+    pass
+
 # Configure logging for systemd journal (stdout)
 # Use unbuffered output and include timestamp for debugging
+# Starts at DEBUG so config loading is logged; log_level from the config is applied after
 logging.basicConfig(
     level=logging.DEBUG,
     format='%(asctime)s [%(levelname)s] %(message)s',
@@ -45,6 +58,7 @@ logging.basicConfig(
 # Force unbuffered stdout for systemd
 sys.stdout.reconfigure(line_buffering=True)
 log = logging.getLogger("soupawhisper")
+# Debug calls on the per-recording path pass %-style arguments so nothing is formatted above DEBUG
 
 # Preload CUDA libraries from pip packages before importing faster_whisper
 def preload_cuda_libs():
@@ -77,11 +91,74 @@ def preload_cuda_libs():
     except ImportError:
         log.debug("CUDA libs not installed via pip, using system libs")
 
-preload_cuda_libs()
+def parse_cpu_list(text):
+    """Parse a sysfs CPU list like '0-7,16-23' into a set of CPU numbers."""
+    cpus = set()
+    for part in text.strip().split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.update(range(int(first), int(last) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+def find_performance_cores():
+    """Return the P-cores of a hybrid CPU, or None when all cores are alike."""
+    available = os.sched_getaffinity(0)
+    # Intel hybrid CPUs list their P-cores under the cpu_core PMU
+    try:
+        cores = parse_cpu_list(Path("/sys/devices/cpu_core/cpus").read_text()) & available
+    except (OSError, ValueError):
+        # Otherwise group by max frequency; the 10% margin absorbs per-core boost differences
+        freqs = {}
+        for cpu in available:
+            try:
+                freqs[cpu] = int(Path(f"/sys/devices/system/cpu/cpu{cpu}/cpufreq/cpuinfo_max_freq").read_text())
+            except (OSError, ValueError):
+                return None
+        top = max(freqs.values(), default=0)
+        cores = {cpu for cpu, freq in freqs.items() if freq >= top * 0.9}
+    if not cores or cores == available:
+        return None
+    return cores
+
+
+def count_physical_cores(cpus):
+    """Count distinct physical cores among CPUs, so SMT siblings count once."""
+    cores = set()
+    for cpu in cpus:
+        topology = Path(f"/sys/devices/system/cpu/cpu{cpu}/topology")
+        try:
+            cores.add(((topology / "physical_package_id").read_text(), (topology / "core_id").read_text()))
+        except OSError:
+            return max(1, len(cpus) // 2)
+    return max(1, len(cores))
+
+
+def default_cpu_threads():
+    """Threads per CTranslate2 worker: an explicit OMP_NUM_THREADS, else physical cores up to 8."""
+    try:
+        return int(os.environ["OMP_NUM_THREADS"])
+    except (KeyError, ValueError):
+        pass
+    # Batch-1 decoding stops scaling well past 8 threads
+    return min(8, count_physical_cores(PERFORMANCE_CORES or os.sched_getaffinity(0)))
+
+
+PERFORMANCE_CORES = find_performance_cores()
+CPU_THREADS = default_cpu_threads()
+
+# CTranslate2 and MKL read these when they are loaded, so set them before importing faster_whisper
+os.environ.setdefault("OMP_NUM_THREADS", str(CPU_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(CPU_THREADS))
 
 import evdev
+import numpy as np
 from evdev import ecodes
-from faster_whisper import WhisperModel
+
+# faster_whisper (ctranslate2, tokenizers, av) is imported by Dictation._load_model
+# on its background thread so the tray and event loop come up without waiting on it
 
 __version__ = "0.3.0"
 
@@ -93,9 +170,27 @@ TRAY_ICONS = {
     "loading": "content-loading-symbolic",
 }
 
+# Recording format: 16kHz mono is what Whisper expects
+SAMPLE_RATE = 16000
+
+# Streaming transcription while the hotkey is held
+STREAM_INTERVAL = 3.0  # Seconds between background passes
+STREAM_HOLDBACK = 2.0  # Most recent seconds that are left for the final pass
+
+# Silence longer than this is cut out before the audio reaches the encoder
+VAD_MIN_SILENCE_MS = 500
+
+# Cheap RMS gate that trims quiet edges before Silero VAD runs
+ENERGY_FRAME = SAMPLE_RATE // 10  # 100ms frames
+ENERGY_THRESHOLD = 0.002  # RMS of float samples, about -54 dBFS
+ENERGY_PAD = SAMPLE_RATE // 2  # Kept around the loud frames for soft onsets and endings
+
 # Load configuration
 CONFIG_PATH = Path.home() / ".config" / "soupawhisper" / "config.ini"
 
+# Keyboard device paths from the last scan, reused while the input devices are unchanged
+KEYBOARD_CACHE_PATH = Path.home() / ".cache" / "soupawhisper" / "keyboards.json"
+
 # Detect Wayland
 IS_WAYLAND = os.environ.get("XDG_SESSION_TYPE") == "wayland" or "WAYLAND_DISPLAY" in os.environ
 
@@ -119,13 +214,16 @@ def load_config():
     defaults = {
         "model": "base.en",
         "device": "cpu",
-        "compute_type": "int8",
+        "compute_type": "auto",
         "key": "f12",
         "auto_type": "true",
         "notifications": "true",
         "audio_device": "default",
         "paste_keys": "ctrl+v",
         "language": "auto",
+        "streaming": "true",
+        "log_level": "info",
+        "beam_size": "1",
     }
 
     if CONFIG_PATH.exists():
@@ -134,23 +232,42 @@ def load_config():
     else:
         log.debug(f"Config file not found, using defaults: {CONFIG_PATH}")
 
+    # A GPU runs a large model at base.en latency; distil-large-v3 only transcribes English
+    device = config.get("whisper", "device", fallback=defaults["device"])
+    language = config.get("whisper", "language", fallback=defaults["language"])
+    if device == "cuda" and not config.has_option("whisper", "model"):
+        defaults["model"] = "distil-large-v3" if language.strip().lower() in ("auto", "en") else "large-v3-turbo"
+        # It still reports itself multilingual, so keep auto-detection from picking another language
+        if language.strip().lower() == "auto":
+            language = "en"
+
     cfg = {
         "model": config.get("whisper", "model", fallback=defaults["model"]),
-        "device": config.get("whisper", "device", fallback=defaults["device"]),
+        "device": device,
         "compute_type": config.get("whisper", "compute_type", fallback=defaults["compute_type"]),
         "key": config.get("hotkey", "key", fallback=defaults["key"]),
         "auto_type": config.getboolean("behavior", "auto_type", fallback=True),
         "notifications": config.getboolean("behavior", "notifications", fallback=True),
         "audio_device": config.get("audio", "device", fallback=defaults["audio_device"]),
         "paste_keys": config.get("behavior", "paste_keys", fallback=defaults["paste_keys"]),
-        "language": config.get("whisper", "language", fallback=defaults["language"]),
+        "log_level": config.get("behavior", "log_level", fallback=defaults["log_level"]),
+        "language": language,
+        "streaming": config.getboolean("whisper", "streaming", fallback=True),
+        "beam_size": config.getint("whisper", "beam_size", fallback=int(defaults["beam_size"])),
     }
-    log.debug(f"Config loaded: model={cfg['model']}, device={cfg['device']}, compute_type={cfg['compute_type']}, language={cfg['language']}, key={cfg['key']}, auto_type={cfg['auto_type']}, notifications={cfg['notifications']}, audio_device={cfg['audio_device']}, paste_keys={cfg['paste_keys']}")
+    log.debug(f"Config loaded: model={cfg['model']}, device={cfg['device']}, compute_type={cfg['compute_type']}, language={cfg['language']}, streaming={cfg['streaming']}, beam_size={cfg['beam_size']}, key={cfg['key']}, auto_type={cfg['auto_type']}, notifications={cfg['notifications']}, audio_device={cfg['audio_device']}, paste_keys={cfg['paste_keys']}, log_level={cfg['log_level']}")
     return cfg
 
 
 CONFIG = load_config()
 
+# Apply the configured level to the root logger so faster_whisper's logger follows it too
+LOG_LEVEL = logging.getLevelName(CONFIG["log_level"].upper())
+if not isinstance(LOG_LEVEL, int):
+    log.warning(f"Unknown log_level: {CONFIG['log_level']}, defaulting to info")
+    LOG_LEVEL = logging.INFO
+logging.getLogger().setLevel(LOG_LEVEL)
+
 
 def get_hotkey_code(key_name):
     """Map key name to evdev keycode."""
@@ -171,6 +288,16 @@ COMPUTE_TYPE = CONFIG["compute_type"]
 AUTO_TYPE = CONFIG["auto_type"]
 NOTIFICATIONS = CONFIG["notifications"]
 AUDIO_DEVICE = CONFIG["audio_device"]
+STREAMING = CONFIG["streaming"]
+BEAM_SIZE = CONFIG["beam_size"]
+
+# Decoding settings shared by the warmup pass and real transcriptions
+TRANSCRIBE_OPTIONS = {
+    "beam_size": BEAM_SIZE,
+    "best_of": 1,
+    "temperature": [0.0, 0.2, 0.4],  # Only retried when a greedy decode fails the quality thresholds
+    "vad_filter": False,  # Silence is cut out beforehand with find_speech/join_speech
+}
 
 # Parse language config: "auto", "en", or "en,it,el" (comma-separated allowed languages)
 def parse_language_config(lang_str):
@@ -204,7 +331,7 @@ PASTE_KEYCODE_MAP = {
 }
 
 def parse_paste_keys(paste_keys_str):
-    """Parse paste keys config (e.g. 'super+v') into ydotool args."""
+    """Parse paste keys config (e.g. 'super+v') into a list of keycodes."""
     parts = [p.strip().lower() for p in paste_keys_str.split("+")]
     keycodes = []
     for part in parts:
@@ -215,7 +342,10 @@ def parse_paste_keys(paste_keys_str):
     if not keycodes:
         log.warning("No valid paste keys, defaulting to Ctrl+V")
         keycodes = [29, 47]  # Ctrl+V
-    # Build ydotool sequence: press all, release in reverse
+    return keycodes
+
+def ydotool_key_args(keycodes):
+    """Build the ydotool key sequence: press all, release in reverse."""
     args = []
     for kc in keycodes:
         args.append(f"{kc}:1")  # press
@@ -223,9 +353,13 @@ def parse_paste_keys(paste_keys_str):
         args.append(f"{kc}:0")  # release
     return args
 
-PASTE_YDOTOOL_ARGS = parse_paste_keys(CONFIG["paste_keys"])
-PASTE_TERMINAL_ARGS = parse_paste_keys("ctrl+shift+v")
-log.debug(f"Paste keys '{CONFIG['paste_keys']}' -> ydotool args: {PASTE_YDOTOOL_ARGS}")
+PASTE_KEYS = parse_paste_keys(CONFIG["paste_keys"])
+PASTE_TERMINAL_KEYS = parse_paste_keys("ctrl+shift+v")
+log.debug(f"Paste keys '{CONFIG['paste_keys']}' -> keycodes: {PASTE_KEYS}")
+
+# gdbus reply parsers, matched against raw stdout bytes
+_NOTIFY_ID_RE = re.compile(rb'\(uint32 (\d+),\)')
+_WINCLASS_RE = re.compile(rb"'resourceClass': <'([^']*)'")
 
 # Terminal app classes that use Ctrl+Shift+V for paste
 TERMINAL_APPS = {
@@ -236,45 +370,181 @@ TERMINAL_APPS = {
     "xfce4-terminal", "terminator", "tilix",
     "foot", "wezterm",
 }
+TERMINAL_APPS_LC = frozenset(t.lower() for t in TERMINAL_APPS)
+
+_session_bus = None
+
+def get_session_bus():
+    """Return the shared session bus connection, or None if Gio is unavailable."""
+    global _session_bus
+    if _session_bus is None and HAS_GIO:
+        try:
+            _session_bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        except GLib.Error as e:
+            log.debug(f"Failed to connect to session bus: {e}")
+    return _session_bus
+
+def call_session_method(bus, dest, path, method, params, reply_type, timeout_ms=-1):
+    """Call a D-Bus method ("interface.Method") on the session bus and unpack the reply."""
+    interface, method_name = method.rsplit(".", 1)
+    reply = bus.call_sync(
+        dest, path, interface, method_name, params,
+        GLib.VariantType(reply_type), Gio.DBusCallFlags.NONE, timeout_ms, None
+    )
+    return reply.unpack()
 
 def get_active_window_class():
     """Get the resource class of the active window via KWin D-Bus."""
     try:
+        bus = get_session_bus()
+        if bus:
+            info, = call_session_method(
+                bus, "org.kde.KWin", "/KWin", "org.kde.KWin.queryWindowInfo",
+                None, "(a{sv})", timeout_ms=1000
+            )
+            return info.get("resourceClass") or None
         result = subprocess.run(
             ["gdbus", "call", "--session",
              "--dest", "org.kde.KWin",
              "--object-path", "/KWin",
              "--method", "org.kde.KWin.queryWindowInfo"],
-            capture_output=True, text=True, timeout=1
+            capture_output=True, timeout=1
         )
         if result.returncode == 0:
             # Parse resourceClass from output
-            import re
-            match = re.search(r"'resourceClass': <'([^']*)'", result.stdout)
+            match = _WINCLASS_RE.search(result.stdout)
             if match:
-                return match.group(1)
+                return match.group(1).decode()
     except Exception as e:
-        log.debug(f"Failed to get active window: {e}")
+        log.debug("Failed to get active window: %s", e)
     return None
 
 def get_paste_keys_for_window(window_class):
     """Get appropriate paste keys based on window class."""
     if window_class:
-        log.debug(f"Checking window class: {window_class}")
-        if window_class.lower() in {t.lower() for t in TERMINAL_APPS}:
+        log.debug("Checking window class: %s", window_class)
+        if window_class.lower() in TERMINAL_APPS_LC:
             log.debug("Using terminal paste keys (Ctrl+Shift+V)")
-            return PASTE_TERMINAL_ARGS
-    log.debug(f"Using default paste keys (Ctrl+V)")
-    return PASTE_YDOTOOL_ARGS
+            return PASTE_TERMINAL_KEYS
+    log.debug("Using default paste keys (Ctrl+V)")
+    return PASTE_KEYS
+
+
+def loud_bounds(audio):
+    """Return (start, end) sample offsets around the frames of audio above ENERGY_THRESHOLD."""
+    frames = len(audio) // ENERGY_FRAME
+    framed = audio[:frames * ENERGY_FRAME].reshape(frames, ENERGY_FRAME)
+    loud = np.flatnonzero(np.sqrt(np.mean(np.square(framed), axis=1)) > ENERGY_THRESHOLD)
+    if not len(loud):
+        return 0, 0
+    return max(0, loud[0] * ENERGY_FRAME - ENERGY_PAD), min(len(audio), (loud[-1] + 1) * ENERGY_FRAME + ENERGY_PAD)
+
+
+def find_speech(audio, energy_gate=True):
+    """Return Silero VAD speech chunks ({"start", "end"} sample offsets) in audio."""
+    from faster_whisper.vad import get_speech_timestamps
+    start, end = loud_bounds(audio) if energy_gate else (0, len(audio))
+    if start == end:
+        return []
+    chunks = get_speech_timestamps(audio[start:end], min_silence_duration_ms=VAD_MIN_SILENCE_MS)
+    return [{"start": chunk["start"] + start, "end": chunk["end"] + start} for chunk in chunks]
+
+
+def join_speech(audio, chunks):
+    """Concatenate the speech chunks of audio, dropping the silence between them."""
+    if not chunks:
+        return audio[:0]
+    return np.concatenate([audio[chunk["start"]:chunk["end"]] for chunk in chunks])
+
+
+def resolve_compute_type(device, compute_type):
+    """Resolve compute_type 'auto' to int8 weights with activations suited to the device."""
+    if compute_type != "auto":
+        return compute_type
+    resolved = "int8"
+    if device == "cuda":
+        import ctranslate2
+        if ctranslate2.get_cuda_device_count() > 0:
+            # CTranslate2 only reports bfloat16 types on compute capability 8.0+ (Ampere and newer)
+            supported = ctranslate2.get_supported_compute_types("cuda")
+            resolved = "int8_bfloat16" if "int8_bfloat16" in supported else "int8_float16"
+        else:
+            log.debug("No CUDA devices visible")
+    log.info(f"Compute type auto resolved to {resolved} on {device}")
+    return resolved
+
+
+def load_cached_keyboards(cache_key):
+    """Open the keyboards from the cache if it matches the current device list."""
+    try:
+        cache = json.loads(KEYBOARD_CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return None
+    if cache.get("key") != cache_key:
+        log.debug("Keyboard cache is stale, rescanning")
+        return None
+    devices = []
+    try:
+        for entry in cache["devices"]:
+            device = evdev.InputDevice(entry["path"])
+            if device.name != entry["name"]:
+                log.debug(f"Cached device {entry['path']} is now {device.name}, rescanning")
+                return None
+            devices.append(device)
+            log.debug(f"Added cached keyboard device: {device.name} ({device.path})")
+    except (OSError, KeyError, TypeError) as e:
+        log.debug(f"Keyboard cache unusable ({e}), rescanning")
+        return None
+    return devices
+
+
+def save_cached_keyboards(cache_key, devices):
+    """Remember which device paths are keyboards for the next startup."""
+    try:
+        KEYBOARD_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        KEYBOARD_CACHE_PATH.write_text(json.dumps({
+            "key": cache_key,
+            "devices": [{"path": d.path, "name": d.name} for d in devices],
+        }))
+    except OSError as e:
+        log.debug(f"Failed to write keyboard cache: {e}")
+
+
+def has_key_events(path):
+    """Check the EV_KEY bit in sysfs, so devices without keys are never opened."""
+    caps = Path("/sys/class/input") / Path(path).name / "device" / "capabilities" / "ev"
+    try:
+        return bool(int(caps.read_text().split()[-1], 16) & (1 << ecodes.EV_KEY))
+    except (OSError, ValueError, IndexError):
+        return True  # Unknown, let the ioctl decide
+
+
+def sysfs_device_name(path):
+    """Read an event device's name from sysfs without opening the device."""
+    try:
+        return (Path("/sys/class/input") / Path(path).name / "device" / "name").read_text().strip()
+    except OSError:
+        return ""
 
 
 def find_keyboard_devices():
     """Find keyboard input devices."""
+    all_devices = evdev.list_devices()
+    # Names too, so a keyboard reusing a node that a mouse or gamepad had invalidates the cache
+    inventory = "\n".join(f"{path}:{sysfs_device_name(path)}" for path in sorted(all_devices))
+    cache_key = hashlib.blake2s(inventory.encode()).hexdigest()[:16]
+    devices = load_cached_keyboards(cache_key)
+    if devices:
+        log.info(f"Found {len(devices)} keyboard device(s) (cached)")
+        return devices
+
     log.debug("Scanning for keyboard input devices...")
     devices = []
-    all_devices = evdev.list_devices()
     log.debug(f"Found {len(all_devices)} input devices total")
     for path in all_devices:
+        if not has_key_events(path):
+            log.debug(f"Skipped (no EV_KEY): {path}")
+            continue
         try:
             device = evdev.InputDevice(path)
             caps = device.capabilities()
@@ -286,13 +556,17 @@ def find_keyboard_devices():
                     log.debug(f"Added keyboard device: {device.name} ({path})")
                 else:
                     log.debug(f"Skipped (no F-keys): {device.name} ({path})")
+                    device.close()
             else:
                 log.debug(f"Skipped (no EV_KEY): {path}")
+                device.close()
         except PermissionError:
             log.warning(f"Permission denied: {path}")
         except OSError as e:
             log.debug(f"OSError for {path}: {e}")
     log.info(f"Found {len(devices)} keyboard device(s)")
+    if devices:
+        save_cached_keyboards(cache_key, devices)
     return devices
 
 
@@ -301,17 +575,37 @@ class Dictation:
         log.debug("Initializing Dictation instance")
         self.recording = False
         self.record_process = None
-        self.temp_file = None
+        self.reader_thread = None
+        self.audio_chunks = []
+        self.stream_thread = None
+        self.stream_stop = threading.Event()
+        self.committed_samples = 0  # Audio already transcribed by the stream thread
+        self.partial_texts = []
+        self.utterance_language = None
         self.model = None
+        self.decode_options = None  # faster_whisper TranscriptionOptions built from TRANSCRIBE_OPTIONS
         self.model_loaded = threading.Event()
         self.model_error = None
         self.running = True
+        self.wakeup_r, self.wakeup_w = os.pipe()  # Written to by stop() to break the event loop wait
         self.notification_id = 0  # For replacing notifications
-        self.target_window_class = None  # Window to paste into
+
+        # Virtual keyboard for the paste shortcut, falls back to ydotool if /dev/uinput isn't writable
+        self.uinput = None
+        if AUTO_TYPE and IS_WAYLAND:
+            try:
+                self.uinput = evdev.UInput(
+                    {ecodes.EV_KEY: sorted(set(PASTE_KEYS + PASTE_TERMINAL_KEYS))},
+                    name="soupawhisper-paste"
+                )
+                log.debug(f"Created uinput device for auto-paste: {self.uinput.device.path}")
+            except (OSError, evdev.UInputError) as e:
+                log.info(f"Cannot open /dev/uinput ({e}), using ydotool for auto-paste")
 
         # Load model in background
         log.info(f"Loading Whisper model ({MODEL_SIZE}) on {DEVICE} with {COMPUTE_TYPE}...")
-        threading.Thread(target=self._load_model, daemon=True).start()
+        self.model_thread = threading.Thread(target=self._load_model, daemon=True)
+        self.model_thread.start()
 
         # System tray icon
         self.indicator = None
@@ -381,7 +675,8 @@ class Dictation:
     def _on_restart(self, widget):
         log.info("Restart requested from tray")
         GLib.idle_add(Gtk.main_quit)
-        os.execv(sys.executable, [sys.executable] + sys.argv)
+        # -OO drops docstrings and asserts, matching how the service and run.sh start us
+        os.execv(sys.executable, [sys.executable, "-OO"] + sys.argv)
 
     def _on_quit(self, widget):
         log.info("Quit requested from tray")
@@ -407,7 +702,25 @@ class Dictation:
         try:
             import time
             start_time = time.time()
-            self.model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
+            if PERFORMANCE_CORES:
+                # CTranslate2 and ONNX Runtime threads started from here inherit this affinity
+                log.info(f"Pinning model threads to performance cores: {sorted(PERFORMANCE_CORES)}")
+                os.sched_setaffinity(0, PERFORMANCE_CORES)
+            if DEVICE != "cpu":
+                preload_cuda_libs()
+            from faster_whisper import WhisperModel
+            log.debug(f"faster_whisper imported in {time.time() - start_time:.1f}s, using {CPU_THREADS} CPU threads")
+            compute_type = resolve_compute_type(DEVICE, COMPUTE_TYPE)
+            model_args = dict(device=DEVICE, compute_type=compute_type,
+                              cpu_threads=CPU_THREADS, num_workers=1)
+            try:
+                # Use the cached snapshot without asking the Hugging Face hub for revisions
+                self.model = WhisperModel(MODEL_SIZE, local_files_only=True, **model_args)
+            except FileNotFoundError:
+                log.info(f"Model '{MODEL_SIZE}' not cached yet, downloading...")
+                self.model = WhisperModel(MODEL_SIZE, **model_args)
+            log.debug(f"Model weights loaded in {time.time() - start_time:.1f}s, warming up...")
+            self._warmup_model()
             elapsed = time.time() - start_time
             self.model_loaded.set()
             log.info(f"Model loaded successfully in {elapsed:.1f}s - Ready for dictation!")
@@ -420,13 +733,35 @@ class Dictation:
             if "cudnn" in str(e).lower() or "cuda" in str(e).lower():
                 log.error("Hint: Try setting device = cpu in your config, or install cuDNN.")
 
+    def _warmup_model(self):
+        """Run a silent transcription so the first real one hits warm kernels."""
+        # Forces CTranslate2 to allocate its workspace and select GEMM/cuDNN algorithms now
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        segments, info = self.model.transcribe(silence, language=LANGUAGE or "en", **TRANSCRIBE_OPTIONS)
+        list(segments)
+        self.decode_options = info.transcription_options
+        # Silero VAD is loaded on first use and cached by faster_whisper, so load it here too
+        find_speech(silence, energy_gate=False)
+
     def notify(self, title, message, icon="dialog-information", timeout=2000):
         """Send a desktop notification that replaces the previous one."""
         if not NOTIFICATIONS:
-            log.debug(f"Notification suppressed (disabled): {title}")
+            log.debug("Notification suppressed (disabled): %s", title)
             return
-        log.debug(f"Sending notification: {title} - {message}")
+        log.debug("Sending notification: %s - %s", title, message)
         try:
+            bus = get_session_bus()
+            if bus:
+                # replaces_id is always 0 - KDE doesn't show replaced notifications after dismiss
+                self.notification_id, = call_session_method(
+                    bus, "org.freedesktop.Notifications", "/org/freedesktop/Notifications",
+                    "org.freedesktop.Notifications.Notify",
+                    GLib.Variant("(susssasa{sv}i)", ("SoupaWhisper", 0, icon, title, message, [], {}, timeout)),
+                    "(u)"
+                )
+                log.debug("Notification sent with id=%s", self.notification_id)
+                return
+
             # Use gdbus to call notification daemon directly - supports replacement on KDE
             result = subprocess.run(
                 [
@@ -443,19 +778,17 @@ class Dictation:
                     "{}",  # hints
                     str(timeout),  # timeout
                 ],
-                capture_output=True,
-                text=True
+                capture_output=True
             )
             # Parse the returned notification ID for future replacement
             # Output format: (uint32 123,)
             if result.stdout:
-                import re
-                match = re.search(r'\(uint32 (\d+),\)', result.stdout)
+                match = _NOTIFY_ID_RE.search(result.stdout)
                 if match:
                     self.notification_id = int(match.group(1))
-                    log.debug(f"Notification sent with id={self.notification_id}")
+                    log.debug("Notification sent with id=%s", self.notification_id)
         except Exception as e:
-            log.debug(f"gdbus notification failed: {e}, falling back to notify-send")
+            log.debug("D-Bus notification failed: %s, falling back to notify-send", e)
             # Fallback to notify-send
             subprocess.run(
                 ["notify-send", "-a", "SoupaWhisper", "-i", icon, "-t", str(timeout), title, message],
@@ -472,30 +805,145 @@ class Dictation:
 
         self.recording = True
         self._update_tray("recording")
-        self.temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        self.temp_file.close()
-        log.debug(f"Created temp file: {self.temp_file.name}")
-
-        # Record using arecord (ALSA)
-        log.debug(f"Starting arecord subprocess (device={AUDIO_DEVICE})")
-        arecord_cmd = ["arecord"]
+        self.audio_chunks = []
+        self.committed_samples = 0
+        self.partial_texts = []
+        self.utterance_language = None
+
+        # Record using arecord (ALSA), streaming raw PCM into memory
+        log.debug("Starting arecord subprocess (device=%s)", AUDIO_DEVICE)
+        arecord_cmd = ["arecord", "-q"]
         if AUDIO_DEVICE != "default":
             arecord_cmd.extend(["-D", AUDIO_DEVICE])
         arecord_cmd.extend([
             "-f", "S16_LE",  # Format: 16-bit little-endian
-            "-r", "16000",   # Sample rate: 16kHz (what Whisper expects)
+            "-r", str(SAMPLE_RATE),
             "-c", "1",       # Mono
-            "-t", "wav",
-            self.temp_file.name
+            "-t", "raw",     # Headerless PCM on stdout
         ])
         self.record_process = subprocess.Popen(
             arecord_cmd,
-            stdout=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL
         )
+        self.reader_thread = threading.Thread(
+            target=self._read_audio, args=(self.record_process,), daemon=True
+        )
+        self.reader_thread.start()
+        if STREAMING:
+            self.stream_stop.clear()
+            self.stream_thread = threading.Thread(target=self._stream_transcribe, daemon=True)
+            self.stream_thread.start()
         log.info(f"Recording started (pid={self.record_process.pid})")
         self.notify("Recording...", f"Release {HOTKEY_NAME} when done", "audio-input-microphone", 30000)
 
+    def _read_audio(self, process):
+        """Drain arecord's stdout into memory until it exits."""
+        fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            self.audio_chunks.append(chunk)
+        process.stdout.close()
+
+    def _collect_audio(self, start=0):
+        """Convert the captured S16_LE PCM from sample start on into the float32 array Whisper expects."""
+        pcm = b"".join(self.audio_chunks)
+        pcm = pcm[:len(pcm) - len(pcm) % 2]  # Drop a trailing partial sample
+        # Only the samples after start are converted, committed audio is skipped in place
+        offset = min(start * 2, len(pcm))
+        return np.frombuffer(pcm, dtype=np.int16, offset=offset).astype(np.float32) * (1.0 / 32768.0)
+
+    def _press_keys(self, keycodes):
+        """Press keycodes together on the uinput device, then release in reverse."""
+        for kc in keycodes:
+            self.uinput.write(ecodes.EV_KEY, kc, 1)
+        self.uinput.syn()
+        for kc in reversed(keycodes):
+            self.uinput.write(ecodes.EV_KEY, kc, 0)
+        self.uinput.syn()
+
+    def _pick_language(self, all_probs):
+        """Pick the language from (code, probability) pairs sorted by probability."""
+        detected, probability = all_probs[0]
+        log.debug("Detected language: %s (%.2f)", detected, probability)
+        if not ALLOWED_LANGUAGES or detected in ALLOWED_LANGUAGES:
+            return detected
+        fallback = next((lang for lang, _ in all_probs if lang in ALLOWED_LANGUAGES), ALLOWED_LANGUAGES[0])
+        log.info(f"Detected '{detected}' not in allowed {ALLOWED_LANGUAGES}, using '{fallback}'")
+        return fallback
+
+    def _detect_and_transcribe(self, audio, prompt=None):
+        """Detect the language and transcribe, running the encoder on the first window only once."""
+        # WhisperModel.transcribe() encodes the first 30s for language detection and again
+        # for decoding; generate_segments() instead reuses a given encoder output for it
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        model = self.model
+        features = model.feature_extractor(audio)
+        # Exactly the first window generate_segments() would encode
+        content_frames = features.shape[-1] - 1
+        first_window = pad_or_trim(features[:, :min(model.feature_extractor.nb_max_frames, content_frames)])
+        encoder_output = model.encode(first_window)
+
+        results = model.model.detect_language(encoder_output)[0]
+        self.utterance_language = self._pick_language([(token[2:-2], prob) for token, prob in results])
+
+        tokenizer = Tokenizer(model.hf_tokenizer, True, task="transcribe", language=self.utterance_language)
+        options = dataclasses.replace(self.decode_options, clip_timestamps="0", initial_prompt=prompt)
+        return model.generate_segments(features, tokenizer, options, False, encoder_output)
+
+    def _transcribe(self, audio, prompt=None):
+        """Transcribe speech-only float32 audio after the prompt text and return the joined text."""
+        if len(audio) == 0:
+            return ""
+        # The language is detected once per recording, then reused by later passes
+        if not (LANGUAGE or self.utterance_language) and self.model.model.is_multilingual:
+            try:
+                # Joined here: generate_segments() is lazy, the private APIs run while iterating
+                return " ".join(segment.text.strip() for segment in self._detect_and_transcribe(audio, prompt))
+            except (TypeError, AttributeError, ValueError) as e:
+                # Private faster_whisper APIs changed, lose the shared encoder pass but keep dictating
+                log.warning(f"Single-pass language detection unavailable, using transcribe(): {e}")
+        segments, info = self.model.transcribe(
+            audio, language=LANGUAGE or self.utterance_language, initial_prompt=prompt, **TRANSCRIBE_OPTIONS
+        )
+        return " ".join(segment.text.strip() for segment in segments)
+
+    def _stream_transcribe(self):
+        """Transcribe finished phrases in the background while the hotkey is held."""
+        while not self.stream_stop.wait(STREAM_INTERVAL):
+            if not self.model_loaded.is_set() or self.model_error:
+                continue
+            try:
+                self._commit_finished_speech()
+            except Exception as e:
+                log.warning(f"Streaming transcription failed, deferring to final pass: {e}")
+                return
+
+    def _commit_finished_speech(self):
+        """Transcribe pending audio up to the last pause, leaving the tail for later."""
+        pending = self._collect_audio(self.committed_samples)
+        window = pending[:len(pending) - int(STREAM_HOLDBACK * SAMPLE_RATE)]
+        if len(window) < SAMPLE_RATE:
+            return
+
+        # Only cut in silence: a speech chunk still running at the window edge ends at len(window)
+        chunks = find_speech(window)
+        finished = [chunk for chunk in chunks if chunk["end"] < len(window)]
+        if chunks and not finished:
+            return
+        cut = finished[-1]["end"] if finished else len(window)
+
+        # Earlier pieces as the prompt let the decoder continue their sentence instead of starting anew
+        text = self._transcribe(join_speech(window, finished), " ".join(self.partial_texts) or None)
+        if text:
+            self.partial_texts.append(text)
+        self.committed_samples += cut
+        log.debug("Streamed %.2fs of audio (%.2fs committed)", cut / SAMPLE_RATE, self.committed_samples / SAMPLE_RATE)
+
     def stop_recording(self):
         if not self.recording:
             log.debug("stop_recording called but not recording, ignoring")
@@ -505,10 +953,17 @@ class Dictation:
         log.debug("Stopping recording")
 
         if self.record_process:
-            log.debug(f"Terminating arecord (pid={self.record_process.pid})")
+            log.debug("Terminating arecord (pid=%s)", self.record_process.pid)
             self.record_process.terminate()
             self.record_process.wait()
             self.record_process = None
+        if self.reader_thread:
+            self.reader_thread.join()
+            self.reader_thread = None
+        if self.stream_thread:
+            self.stream_stop.set()
+            self.stream_thread.join()
+            self.stream_thread = None
 
         log.info("Recording stopped, transcribing...")
         self._update_tray("processing")
@@ -527,43 +982,22 @@ class Dictation:
         try:
             import time
             start_time = time.time()
-            log.debug(f"Starting transcription of {self.temp_file.name}")
-
-            # Check file size
-            file_size = os.path.getsize(self.temp_file.name)
-            log.debug(f"Audio file size: {file_size} bytes")
-
-            # Determine language for transcription
-            use_language = LANGUAGE
-            if ALLOWED_LANGUAGES and not LANGUAGE:
-                # First pass: detect language
-                _, detect_info = self.model.transcribe(
-                    self.temp_file.name, beam_size=1, vad_filter=True
-                )
-                detected = detect_info.language
-                log.debug(f"Detected language: {detected}")
-                if detected not in ALLOWED_LANGUAGES:
-                    log.info(f"Detected '{detected}' not in allowed {ALLOWED_LANGUAGES}, using '{ALLOWED_LANGUAGES[0]}'")
-                    use_language = ALLOWED_LANGUAGES[0]
-                else:
-                    use_language = detected
-
-            segments, info = self.model.transcribe(
-                self.temp_file.name,
-                beam_size=5,
-                vad_filter=True,
-                language=use_language,
-            )
-
-            text = " ".join(segment.text.strip() for segment in segments)
+            # Only the audio the stream thread has not committed yet is left to do
+            audio = self._collect_audio(self.committed_samples)
+            speech = join_speech(audio, find_speech(audio))
+            log.debug("Starting transcription of %.2fs of speech in %.2fs of audio (%d streamed part(s))",
+                      len(speech) / SAMPLE_RATE, len(audio) / SAMPLE_RATE, len(self.partial_texts))
+
+            texts = self.partial_texts + [self._transcribe(speech, " ".join(self.partial_texts) or None)]
+            text = " ".join(t for t in texts if t)
             elapsed = time.time() - start_time
-            log.debug(f"Transcription completed in {elapsed:.2f}s")
+            log.debug("Transcription completed in %.2fs", elapsed)
 
             if text:
                 log.info(f"Transcribed ({len(text)} chars): {text[:80]}{'...' if len(text) > 80 else ''}")
 
                 # Copy to clipboard
-                log.debug(f"Copying to clipboard ({'Wayland' if IS_WAYLAND else 'X11'})")
+                log.debug("Copying to clipboard (%s)", "Wayland" if IS_WAYLAND else "X11")
                 if IS_WAYLAND:
                     process = subprocess.Popen(["wl-copy"], stdin=subprocess.PIPE)
                 else:
@@ -571,14 +1005,20 @@ class Dictation:
                         ["xclip", "-selection", "clipboard"],
                         stdin=subprocess.PIPE
                     )
-                process.communicate(input=text.encode())
+                # Plain write + close: communicate() would set up extra machinery for a one-shot write
+                process.stdin.write(text.encode())
+                process.stdin.close()
+                process.wait()
 
                 # Type it into the active input field
                 if AUTO_TYPE:
-                    log.debug(f"Auto-typing with paste keys: {PASTE_YDOTOOL_ARGS}")
                     time.sleep(0.15)  # Small delay to ensure clipboard is ready
                     if IS_WAYLAND:
-                        subprocess.run(["ydotool", "key"] + PASTE_YDOTOOL_ARGS)
+                        log.debug("Auto-typing with paste keys: %s", PASTE_KEYS)
+                        if self.uinput:
+                            self._press_keys(PASTE_KEYS)
+                        else:
+                            subprocess.run(["ydotool", "key"] + ydotool_key_args(PASTE_KEYS))
                     else:
                         subprocess.run(["xdotool", "type", "--clearmodifiers", text])
 
@@ -588,24 +1028,47 @@ class Dictation:
                 self.notify("No speech detected", "Try speaking louder", "dialog-warning", 2000)
 
         except Exception as e:
-            log.error(f"Transcription error: {e}", exc_info=True)
+            # Full traceback only when debugging, transient CUDA errors can repeat a lot
+            log.error("Transcription error: %s", e, exc_info=log.isEnabledFor(logging.DEBUG))
             self.notify("Error", str(e)[:50], "dialog-error", 3000)
         finally:
-            # Cleanup temp file
-            if self.temp_file and os.path.exists(self.temp_file.name):
-                log.debug(f"Cleaning up temp file: {self.temp_file.name}")
-                os.unlink(self.temp_file.name)
+            self.audio_chunks = []
             self._update_tray("ready")
 
     def stop(self):
-        log.info("Shutting down...")
+        """Ask the event loop to exit. Safe to call from signal handlers and other threads."""
         self.running = False
+        os.write(self.wakeup_w, b"\0")
+
+    def shutdown(self):
+        """Stop any recording and release the microphone, uinput device and model, then exit."""
+        log.info("Shutting down...")
+        self.stream_stop.set()
+        if self.record_process and self.record_process.poll() is None:
+            log.debug("Terminating arecord (pid=%s)", self.record_process.pid)
+            self.record_process.terminate()
+            try:
+                self.record_process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.record_process.kill()
+                self.record_process.wait()
+        for thread in (self.reader_thread, self.stream_thread, self.model_thread):
+            if thread:
+                thread.join(timeout=2)
+        if self.uinput:
+            self.uinput.close()
         if HAS_TRAY:
             try:
                 GLib.idle_add(Gtk.main_quit)
             except:
                 pass
-        os._exit(0)
+        if self.model_thread.is_alive() or (self.stream_thread and self.stream_thread.is_alive()):
+            # Still loading or transcribing inside CTranslate2, interpreter teardown could crash under it
+            log.debug("Model still busy, exiting without interpreter teardown")
+            os._exit(0)
+        # Drop the CTranslate2 model (and its GPU memory) while the interpreter is still intact
+        self.model = None
+        sys.exit(0)
 
     def run(self):
         """Main event loop using evdev for keyboard input."""
@@ -622,63 +1085,73 @@ class Dictation:
         for d in devices:
             log.info(f"  - {d.name}")
 
-        # Create a dict mapping fd to device
-        fd_to_device = {dev.fd: dev for dev in devices}
+        # Block in epoll until a device or the wakeup pipe is readable, no idle polling
+        selector = selectors.EpollSelector()
+        for dev in devices:
+            selector.register(dev, selectors.EVENT_READ, dev)
+        selector.register(self.wakeup_r, selectors.EVENT_READ, None)
         log.debug(f"Event loop starting, waiting for {HOTKEY_NAME} key events...")
 
+        # Keyboards other than the one holding the hotkey, unwatched while recording
+        idle_devices = []
         while self.running:
-            # Use select to wait for events from any device
-            r, _, _ = select.select(fd_to_device.keys(), [], [], 0.1)
-            for fd in r:
-                device = fd_to_device[fd]
+            for key, _ in selector.select():
+                device = key.data
+                if device is None:  # Woken up by stop()
+                    continue
                 try:
                     for event in device.read():
                         if event.type == ecodes.EV_KEY and event.code == HOTKEY_CODE:
                             if event.value == 1:  # Key pressed
-                                log.debug(f"Hotkey {HOTKEY_NAME} pressed")
+                                log.debug("Hotkey %s pressed", HOTKEY_NAME)
                                 self.start_recording()
+                                # Only this keyboard can deliver the release, so typing elsewhere
+                                # should not wake the loop. No grab(): the compositor must still
+                                # see the release, and the user may keep typing.
+                                if not idle_devices:
+                                    idle_devices = [dev for dev in devices if dev is not device]
+                                    for dev in idle_devices:
+                                        selector.unregister(dev)
                             elif event.value == 0:  # Key released
-                                log.debug(f"Hotkey {HOTKEY_NAME} released")
+                                log.debug("Hotkey %s released", HOTKEY_NAME)
                                 self.stop_recording()
+                                for dev in idle_devices:
+                                    # Drop what was typed meanwhile, a queued hotkey would replay as a recording
+                                    try:
+                                        for _ in dev.read():
+                                            pass
+                                    except BlockingIOError:
+                                        pass
+                                    selector.register(dev, selectors.EVENT_READ, dev)
+                                idle_devices = []
                 except BlockingIOError:
                     pass
+        selector.close()
+        for dev in devices:
+            dev.close()
 
 
 def check_dependencies():
     """Check that required system commands are available."""
     log.debug("Checking system dependencies...")
-    missing = []
-
-    # Audio recording
-    if subprocess.run(["which", "arecord"], capture_output=True).returncode != 0:
-        missing.append(("arecord", "alsa-utils"))
-    else:
-        log.debug("Found: arecord")
 
-    # Clipboard
-    if IS_WAYLAND:
-        if subprocess.run(["which", "wl-copy"], capture_output=True).returncode != 0:
-            missing.append(("wl-copy", "wl-clipboard"))
-        else:
-            log.debug("Found: wl-copy")
-    else:
-        if subprocess.run(["which", "xclip"], capture_output=True).returncode != 0:
-            missing.append(("xclip", "xclip"))
+    # (command, package) pairs: audio recording, clipboard, then auto-typing
+    required = [("arecord", "alsa-utils")]
+    required.append(("wl-copy", "wl-clipboard") if IS_WAYLAND else ("xclip", "xclip"))
+    if AUTO_TYPE:
+        if not IS_WAYLAND:
+            required.append(("xdotool", "xdotool"))
+        elif os.access("/dev/uinput", os.W_OK):
+            log.debug("Found: writable /dev/uinput")
         else:
-            log.debug("Found: xclip")
+            required.append(("ydotool", "ydotool"))
 
-    # Auto-typing
-    if AUTO_TYPE:
-        if IS_WAYLAND:
-            if subprocess.run(["which", "ydotool"], capture_output=True).returncode != 0:
-                missing.append(("ydotool", "ydotool"))
-            else:
-                log.debug("Found: ydotool")
+    missing = []
+    for cmd, pkg in required:
+        if shutil.which(cmd) is None:
+            missing.append((cmd, pkg))
         else:
-            if subprocess.run(["which", "xdotool"], capture_output=True).returncode != 0:
-                missing.append(("xdotool", "xdotool"))
-            else:
-                log.debug("Found: xdotool")
+            log.debug(f"Found: {cmd}")
 
     if missing:
         log.error("Missing dependencies:")
@@ -718,6 +1191,7 @@ def main():
     log.debug("Signal handlers installed (SIGINT, SIGTERM)")
 
     dictation.run()
+    dictation.shutdown()
 
 
 if __name__ == "__main__":
@@ -74,6 +74,10 @@ install_python() {
     echo "Installing Python dependencies..."
     pip install -r "$SCRIPT_DIR/requirements.txt"
 
+    # Byte-compile dependencies up front for the -OO interpreter the service uses
+    echo "Precompiling Python modules..."
+    python -OO -m compileall -qq -j 0 "$VENV_DIR/lib" || true
+
     deactivate
     echo "Python dependencies installed!"
 }
@@ -111,7 +115,7 @@ After=graphical-session.target
 [Service]
 Type=simple
 WorkingDirectory=$SCRIPT_DIR
-ExecStart=$VENV_DIR/bin/python $SCRIPT_DIR/dictate.py
+ExecStart=$VENV_DIR/bin/python -OO $SCRIPT_DIR/dictate.py
 Restart=on-failure
 RestartSec=5
 
@@ -109,6 +109,10 @@ install_python() {
     fi
 
     poetry install
+
+    # Byte-compile dependencies up front for the -OO interpreter the service uses
+    echo "Precompiling Python modules..."
+    poetry run python -OO -m compileall -qq -j 0 "$(poetry env info --path)/lib" || true
 }
 
 # Setup config file
@@ -150,7 +154,7 @@ Wants=ydotool.service
 [Service]
 Type=simple
 WorkingDirectory=$SCRIPT_DIR
-ExecStart=$venv_path/bin/python $SCRIPT_DIR/dictate.py
+ExecStart=$venv_path/bin/python -OO $SCRIPT_DIR/dictate.py
 Restart=on-failure
 RestartSec=5
 
@@ -174,7 +178,7 @@ After=graphical-session.target
 [Service]
 Type=simple
 WorkingDirectory=$SCRIPT_DIR
-ExecStart=$venv_path/bin/python $SCRIPT_DIR/dictate.py
+ExecStart=$venv_path/bin/python -OO $SCRIPT_DIR/dictate.py
 Restart=on-failure
 RestartSec=5
 
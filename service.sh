@@ -37,7 +37,7 @@ Wants=ydotool.service
 [Service]
 Type=simple
 WorkingDirectory=$SCRIPT_DIR
-ExecStart=$venv_path/bin/python $SCRIPT_DIR/dictate.py
+ExecStart=$venv_path/bin/python -OO $SCRIPT_DIR/dictate.py
 Restart=on-failure
 RestartSec=5
 
@@ -57,7 +57,7 @@ After=graphical-session.target
 [Service]
 Type=simple
 WorkingDirectory=$SCRIPT_DIR
-ExecStart=$venv_path/bin/python $SCRIPT_DIR/dictate.py
+ExecStart=$venv_path/bin/python -OO $SCRIPT_DIR/dictate.py
 Restart=on-failure
 RestartSec=5
 